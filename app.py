@@ -1,12 +1,20 @@
 import os
+import asyncio
+import openai
+import httpx
 import streamlit as st
 from graphviz import Digraph
-import xmltodict
+from graphviz.quoting import quote
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
-import json
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
+import orjson
 import re
+import time
+from xml.sax.saxutils import escape
 
 # ---- Configuration ----
 st.set_page_config(
@@ -15,139 +23,298 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# ---- LLM Response Cache ----
+@st.cache_resource
+def init_llm_cache(database_path=".llm_cache.db"):
+    """Cache completions on disk so re-running the same scenario skips the API calls"""
+    cache = SQLiteCache(database_path=database_path)
+    set_llm_cache(cache)
+    return cache
+
+init_llm_cache()
+
+# ---- HTTP Client ----
+@st.cache_resource
+def init_http_client():
+    """Shared connection-pooled HTTP/2 client so stage calls and reruns reuse open connections"""
+    return httpx.Client(http2=True, limits=httpx.Limits(max_keepalive_connections=16))
+
 # ---- OpenAI Setup ----
-def init_llm(api_key, model="gpt-4"):
-    """Initialize LLM instance with user-provided API key"""
+class PriorityTierFallbackHandler(BaseCallbackHandler):
+    """Drop a client back to the default tier after its first priority-tier rejection,
+    so later calls skip the failing priority request instead of retrying it every time"""
+    
+    run_inline = True
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def on_llm_error(self, error, **kwargs):
+        if isinstance(error, openai.BadRequestError):
+            self.llm.service_tier = None
+
+def init_llm(api_key, model="gpt-4", optimize_latency=False):
+    """Initialize LLM instance with user-provided API key.
+    With optimize_latency, requests use OpenAI's priority tier and fall back
+    to the default tier if the account or model rejects it; after the first
+    rejection this session's client stays on the default tier.
+    The client is reused across reruns through this session's state only,
+    so the key is never kept in a process-wide cache."""
     if not api_key:
         return None
     
+    settings_key = (api_key, model, optimize_latency)
+    cached = st.session_state.get("llm")
+    if cached and cached[0] == settings_key:
+        return cached[1]
+    
     try:
-        return ChatOpenAI(
+        settings = dict(
             openai_api_key=api_key,
             model_name=model,
             temperature=0.1,  # Slightly increased for more creative solutions
             max_retries=3,
-            streaming=False
+            streaming=True,
+            http_client=init_http_client()
         )
+        llm = ChatOpenAI(**settings)
+        if optimize_latency:
+            priority_llm = ChatOpenAI(service_tier="priority", **settings)
+            priority_llm.callbacks = [PriorityTierFallbackHandler(priority_llm)]
+            llm = priority_llm.with_fallbacks([llm], exceptions_to_handle=(openai.BadRequestError,))
+        st.session_state["llm"] = (settings_key, llm)
+        return llm
     except Exception as e:
         st.error(f"Error initializing OpenAI API: {str(e)}")
         return None
 
+# ---- Streaming Helpers ----
+class PlaceholderStreamHandler(BaseCallbackHandler):
+    """Write streamed LLM tokens into a Streamlit placeholder as they arrive"""
+    
+    # Run on the script thread so async calls keep their Streamlit context
+    run_inline = True
+    
+    # Re-render after this many seconds or buffered tokens, whichever comes first
+    FLUSH_INTERVAL = 0.05
+    FLUSH_TOKENS = 20
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self.tokens = []
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.interrupt = None
+
+    def on_llm_new_token(self, token, **kwargs):
+        try:
+            self.handle_token(token)
+        except BaseException as e:
+            # Streamlit's rerun/stop signals are BaseExceptions that LangChain may
+            # replace while unwinding, so keep the original for reraise_interrupt
+            if not isinstance(e, Exception):
+                self.interrupt = e
+            raise
+
+    def reraise_interrupt(self):
+        """Re-raise a Streamlit rerun/stop signal caught while streaming, if any"""
+        if self.interrupt is not None:
+            raise self.interrupt
+
+    def handle_token(self, token):
+        self.tokens.append(token)
+        self.pending += 1
+        
+        now = time.monotonic()
+        if self.pending >= self.FLUSH_TOKENS or now - self.last_flush >= self.FLUSH_INTERVAL:
+            self.placeholder.markdown("".join(self.tokens))
+            self.pending = 0
+            self.last_flush = now
+
+class TaskGraphStreamHandler(PlaceholderStreamHandler):
+    """Stream text like PlaceholderStreamHandler while drawing the process graph
+    from each completed step line, so the flow appears as the LLM writes it"""
+    
+    # Redraw the graph once this many new tasks have been found
+    REDRAW_TASKS = 3
+
+    def __init__(self, placeholder, graph_placeholder, title):
+        super().__init__(placeholder)
+        self.graph_placeholder = graph_placeholder
+        self.title = title
+        self.line_tokens = []
+        self.tasks = []
+        self.drawn = 0
+
+    def handle_token(self, token):
+        super().handle_token(token)
+        
+        # Buffer the current line's tokens and only join them once it is complete
+        if '\n' not in token:
+            self.line_tokens.append(token)
+        else:
+            first, *rest = token.split('\n')
+            lines = ["".join(self.line_tokens) + first] + rest[:-1]
+            self.line_tokens = [rest[-1]]
+            for line in lines:
+                task = _task_from_match(_LINE_RE.match(line))
+                if task:
+                    self.tasks.append(task)
+        
+        if len(self.tasks) - self.drawn >= self.REDRAW_TASKS:
+            self.graph_placeholder.graphviz_chart(_build_graph_source(self.tasks, self.title))
+            self.drawn = len(self.tasks)
+
+def stage_chain(llm, prompt):
+    """Compose a stage prompt and the LLM into an LCEL chain that returns plain text"""
+    return prompt | llm | StrOutputParser()
+
+def stream_stage(llm, prompt, handler, **inputs):
+    """Run a stage prompt, streaming tokens through a PlaceholderStreamHandler,
+    and return the full response text"""
+    try:
+        result = stage_chain(llm, prompt).invoke(inputs, config={"callbacks": [handler]})
+    except BaseException:
+        handler.reraise_interrupt()
+        raise
+    handler.placeholder.markdown(result)
+    return result
+
+async def astream_batch(llm, prompts, handlers, **inputs):
+    """Run independent stage prompts concurrently, streaming each through its own handler.
+    Returns one response text (or the raised exception) per prompt."""
+    async def run(prompt, handler):
+        # Only stage errors become results; Streamlit's rerun/stop control flow
+        # (BaseException) must still propagate and abort the script run
+        try:
+            return await stage_chain(llm, prompt).ainvoke(inputs, config={"callbacks": [handler]})
+        except Exception as e:
+            handler.reraise_interrupt()
+            return e
+    
+    results = await asyncio.gather(*(run(prompt, handler) for prompt, handler in zip(prompts, handlers)))
+    
+    for handler, result in zip(handlers, results):
+        if not isinstance(result, Exception):
+            handler.placeholder.markdown(result)
+    return results
+
+def run_identification_discovery(llm, description):
+    """Answer the Identification and Discovery stages with one JSON-mode completion,
+    so the description is only sent and processed once.
+    Returns (identification_text, numbered_discovery_steps)."""
+    json_llm = llm.bind(response_format={"type": "json_object"})
+    raw = stage_chain(json_llm, IDENTIFICATION_DISCOVERY_PROMPT).invoke({"description": description})
+    # orjson only accepts exact str/bytes, and LangChain may return a str subclass
+    result = orjson.loads(raw.encode())
+    
+    # JSON mode guarantees valid JSON, not the requested shape
+    identification = result.get("identification") if isinstance(result, dict) else None
+    discovery_steps = result.get("discovery_steps") if isinstance(result, dict) else None
+    if not isinstance(identification, str):
+        raise ValueError("Model response is missing a text \"identification\" analysis")
+    if not isinstance(discovery_steps, list) or not all(isinstance(step, str) for step in discovery_steps):
+        raise ValueError("Model response is missing a \"discovery_steps\" list of step descriptions")
+    
+    steps = "\n".join(f"{i}. {step}" for i, step in enumerate(discovery_steps, 1))
+    return identification, steps
+
 # ---- Enhanced Helper Functions ----
+# One match per line: a numbered ("1. ...") or bulleted ("- ...", "• ...", "* ...")
+# list item, or any other line longer than 10 characters once stripped
+_LINE_RE = re.compile(
+    r'^[^\S\n]*(?:(?:\d+\.|[-•*])[^\S\n]*(?P<item>\S(?:.*\S)?)|(?P<line>\S.{9,}\S))[^\S\n]*$',
+    re.MULTILINE
+)
+
+# Lead-ins that mark an unlisted line as commentary rather than a process step
+_SKIP_PREFIXES = ('The', 'This', 'Here', 'Below')
+_SKIP_FIRST_CHARS = frozenset(prefix[0] for prefix in _SKIP_PREFIXES)
+
+# Extra entities needed to escape XML attribute values
+_XML_ATTR_ENTITIES = {'"': '&quot;'}
+
+# Fixed parts of every generated BPMN document
+_BPMN_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<definitions xmlns="http://www.omg.org/spec/BPMN/20100524/MODEL" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    'targetNamespace="http://bpmn.io/schema/bpmn">\n'
+)
+_BPMN_FOOTER = '  </process>\n</definitions>\n'
+
+def _truncate(text, limit):
+    """Cut text to limit characters, marking the cut with '...'"""
+    return text if len(text) <= limit else text[:limit] + '...'
+
+def _task_from_match(match):
+    """Return the task text for a _LINE_RE match, or None if the line isn't a task"""
+    if match is None:
+        return None
+    
+    item = match.group('item')
+    if item is not None:
+        return item
+    
+    # If no pattern matches but line is substantial, include it
+    # (the first-character check skips the prefix compare for most lines)
+    line = match.group('line')
+    if line[0] not in _SKIP_FIRST_CHARS or not line.startswith(_SKIP_PREFIXES):
+        return line
+    return None
+
+@st.cache_data(max_entries=64)
 def extract_tasks_from_text(text):
     """Extract numbered or bulleted tasks from LLM response"""
-    # Try to find numbered lists first
-    numbered_pattern = r'^\d+\.\s*(.+)$'
-    bulleted_pattern = r'^[-•*]\s*(.+)$'
-    
-    lines = text.strip().split('\n')
     tasks = []
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Check for numbered items
-        match = re.match(numbered_pattern, line)
-        if match:
-            tasks.append(match.group(1).strip())
-            continue
-            
-        # Check for bulleted items
-        match = re.match(bulleted_pattern, line)
-        if match:
-            tasks.append(match.group(1).strip())
-            continue
-            
-        # If no pattern matches but line is substantial, include it
-        if len(line) > 10 and not line.startswith(('The', 'This', 'Here', 'Below')):
-            tasks.append(line)
+    # Scan the whole response in one pass instead of matching line by line
+    for match in _LINE_RE.finditer(text):
+        task = _task_from_match(match)
+        if task:
+            tasks.append(task)
     
     return tasks if tasks else [line.strip() for line in text.split('\n') if line.strip()]
 
+@st.cache_data(max_entries=64)
 def generate_enhanced_bpmn_xml(tasks, process_name="Business Process"):
     """Generate more structured BPMN XML with proper elements"""
     if not tasks:
         return ""
     
-    # Create start and end events
-    elements = []
-    flows = []
-    
-    # Start event
-    elements.append({
-        'tag': 'startEvent',
-        'attrs': {'id': 'StartEvent_1', 'name': 'Start'}
-    })
-    
     # Tasks
-    for i, task in enumerate(tasks):
-        task_id = f"Task_{i+1}"
-        elements.append({
-            'tag': 'task',
-            'attrs': {'id': task_id, 'name': task[:50] + ('...' if len(task) > 50 else '')}
-        })
-    
-    # End event
-    elements.append({
-        'tag': 'endEvent',
-        'attrs': {'id': 'EndEvent_1', 'name': 'End'}
-    })
-    
-    # Create sequence flows
-    prev_id = 'StartEvent_1'
-    for i, task in enumerate(tasks):
-        task_id = f"Task_{i+1}"
-        flow_id = f"Flow_{i+1}"
-        flows.append({
-            'id': flow_id,
-            'sourceRef': prev_id,
-            'targetRef': task_id
-        })
-        prev_id = task_id
-    
-    # Final flow to end
-    flows.append({
-        'id': f"Flow_{len(tasks)+1}",
-        'sourceRef': prev_id,
-        'targetRef': 'EndEvent_1'
-    })
-    
-    # Build XML structure
-    process_dict = {
-        'definitions': {
-            '@xmlns': 'http://www.omg.org/spec/BPMN/20100524/MODEL',
-            '@xmlns:xsi': 'http://www.w3.org/2001/XMLSchema-instance',
-            '@targetNamespace': 'http://bpmn.io/schema/bpmn',
-            'process': {
-                '@id': 'Process_1',
-                '@isExecutable': 'true',
-                '@name': process_name
-            }
-        }
-    }
-    
-    # Add elements to process
-    for element in elements:
-        tag = element['tag']
-        if tag not in process_dict['definitions']['process']:
-            process_dict['definitions']['process'][tag] = []
-        process_dict['definitions']['process'][tag].append(element['attrs'])
-    
-    # Add sequence flows
-    process_dict['definitions']['process']['sequenceFlow'] = []
-    for flow in flows:
-        process_dict['definitions']['process']['sequenceFlow'].append({
-            '@id': flow['id'],
-            '@sourceRef': flow['sourceRef'],
-            '@targetRef': flow['targetRef']
-        })
-    
-    return xmltodict.unparse(process_dict, pretty=True)
+    task_ids = [f"Task_{i+1}" for i in range(len(tasks))]
+    task_names = [escape(_truncate(task, 50), _XML_ATTR_ENTITIES) for task in tasks]
+    task_lines = [
+        f'    <task id="{task_id}" name="{name}"/>\n'
+        for task_id, name in zip(task_ids, task_names)
+    ]
+    
+    # Sequence flows from start event through each task to end event
+    refs = ['StartEvent_1'] + task_ids + ['EndEvent_1']
+    flow_lines = [
+        f'    <sequenceFlow id="Flow_{i+1}" sourceRef="{source}" targetRef="{target}"/>\n'
+        for i, (source, target) in enumerate(zip(refs, refs[1:]))
+    ]
+    
+    return "".join([
+        _BPMN_HEADER,
+        f'  <process id="Process_1" isExecutable="true" name="{escape(process_name, _XML_ATTR_ENTITIES)}">\n',
+        '    <startEvent id="StartEvent_1" name="Start"/>\n',
+        *task_lines,
+        '    <endEvent id="EndEvent_1" name="End"/>\n',
+        *flow_lines,
+        _BPMN_FOOTER,
+    ])
 
+@st.cache_data(max_entries=64)
 def create_enhanced_graph(tasks, title="Process Flow"):
-    """Create enhanced Graphviz diagram"""
+    """Create enhanced Graphviz diagram, returned as DOT source for st.graphviz_chart"""
+    return _build_graph_source(tasks, title)
+
+def _build_graph_source(tasks, title):
+    """Uncached DOT builder behind create_enhanced_graph, also used for the
+    short-lived partial graphs drawn while a stage is streaming"""
     dot = Digraph(comment=title)
     dot.attr(rankdir='LR', size='12,8')
     dot.attr('node', shape='box', style='rounded,filled', fillcolor='lightblue')
@@ -155,30 +322,29 @@ def create_enhanced_graph(tasks, title="Process Flow"):
     # Start node
     dot.node('start', 'START', shape='circle', fillcolor='lightgreen')
     
-    # Task nodes
-    prev_node = 'start'
-    for i, task in enumerate(tasks):
-        node_id = f'task_{i}'
-        # Truncate long task names for better visualization
-        display_name = task[:30] + '...' if len(task) > 30 else task
-        dot.node(node_id, display_name)
-        dot.edge(prev_node, node_id)
-        prev_node = node_id
+    # Task nodes and edges, written as DOT lines in one batch
+    # (truncate long task names for better visualization)
+    node_ids = [f'task_{i}' for i in range(len(tasks))]
+    node_lines = [
+        f'\t{node_id} [label={quote(_truncate(task, 30))}]\n'
+        for node_id, task in zip(node_ids, tasks)
+    ]
+    path = ['start'] + node_ids
+    edge_lines = [f'\t{source} -> {target}\n' for source, target in zip(path, path[1:])]
+    
+    # Node and edge statements interleave as in per-call construction
+    dot.body.extend(line for pair in zip(node_lines, edge_lines) for line in pair)
     
     # End node
     dot.node('end', 'END', shape='circle', fillcolor='lightcoral')
     if tasks:
-        dot.edge(prev_node, 'end')
+        dot.edge(path[-1], 'end')
     
-    return dot
+    return dot.source
 
 # ---- Enhanced BPM Stage Templates ----
-class BPMStageTemplates:
-    
-    @staticmethod
-    def identification_prompt():
-        return ChatPromptTemplate.from_template(
-            """As a Business Process Management expert, analyze this business process description:
+IDENTIFICATION_PROMPT = ChatPromptTemplate.from_template(
+    """As a Business Process Management expert, analyze this business process description:
 
             {description}
 
@@ -190,12 +356,10 @@ class BPMStageTemplates:
             5. **Improvement Potential**: What are the key areas for optimization?
 
             Keep your response structured and professional."""
-        )
-    
-    @staticmethod
-    def discovery_prompt():
-        return ChatPromptTemplate.from_template(
-            """As a Business Process Analyst, break down this process into clear, sequential steps:
+)
+
+DISCOVERY_PROMPT = ChatPromptTemplate.from_template(
+    """As a Business Process Analyst, break down this process into clear, sequential steps:
 
             {description}
 
@@ -207,12 +371,10 @@ class BPMStageTemplates:
             - Number each step for clarity
 
             Format your response as a numbered list of process steps."""
-        )
-    
-    @staticmethod
-    def analysis_prompt():
-        return ChatPromptTemplate.from_template(
-            """As a Process Improvement Consultant, analyze these process steps for optimization opportunities:
+)
+
+ANALYSIS_PROMPT = ChatPromptTemplate.from_template(
+    """As a Process Improvement Consultant, analyze these process steps for optimization opportunities:
 
             {steps}
 
@@ -225,12 +387,10 @@ class BPMStageTemplates:
             6. **Quality Issues**: Where might quality problems occur?
 
             Be specific and actionable in your recommendations."""
-        )
-    
-    @staticmethod
-    def redesign_prompt():
-        return ChatPromptTemplate.from_template(
-            """As a Digital Transformation Specialist, redesign this process to be more efficient:
+)
+
+REDESIGN_PROMPT = ChatPromptTemplate.from_template(
+    """As a Digital Transformation Specialist, redesign this process to be more efficient:
 
             Original Process Steps:
             {steps}
@@ -246,12 +406,10 @@ class BPMStageTemplates:
             - Enhances quality and consistency
 
             Provide the redesigned process as a numbered list of steps, followed by a brief explanation of key improvements made."""
-        )
-    
-    @staticmethod
-    def monitoring_prompt():
-        return ChatPromptTemplate.from_template(
-            """As a Process Excellence Manager, design a monitoring and optimization framework for this redesigned process:
+)
+
+MONITORING_PROMPT = ChatPromptTemplate.from_template(
+    """As a Process Excellence Manager, design a monitoring and optimization framework for this redesigned process:
 
             Redesigned Process:
             {redesigned_process}
@@ -265,7 +423,34 @@ class BPMStageTemplates:
             6. **Technology Enablers**: Tools or systems that could support monitoring
 
             Focus on measurable, actionable metrics that drive business value."""
-        )
+)
+
+# Combined Identification + Discovery prompt for models that support JSON mode
+IDENTIFICATION_DISCOVERY_PROMPT = ChatPromptTemplate.from_template(
+    """As a Business Process Management expert, analyze this business process description:
+
+            {description}
+
+            Respond with a JSON object with exactly two keys:
+
+            "identification": a markdown string with a comprehensive analysis covering:
+            1. **Business Purpose**: What is the core objective of this process?
+            2. **Key Stakeholders**: Who are the main participants and beneficiaries?
+            3. **Current Pain Points**: What inefficiencies, bottlenecks, or problems do you identify?
+            4. **Business Value**: What value does this process deliver to the organization?
+            5. **Improvement Potential**: What are the key areas for optimization?
+            Keep this analysis structured and professional.
+
+            "discovery_steps": an array of strings breaking the process down into clear, sequential steps:
+            - Extract the main tasks/activities in chronological order
+            - Use clear, action-oriented language
+            - Include decision points where applicable
+            - Focus on "what" is done, not "how"
+            - Put each step in its own array item, without numbering"""
+)
+
+# Models that accept response_format={"type": "json_object"}
+JSON_MODE_MODELS = {"gpt-4-turbo", "gpt-3.5-turbo"}
 
 # ---- Enhanced Scenarios ----
 DEMO_SCENARIOS = {
@@ -368,15 +553,6 @@ def main():
         """)
         return
     
-    # Initialize LLM
-    llm = init_llm(api_key, model_choice)
-    if not llm:
-        st.error("Failed to initialize OpenAI API. Please check your API key.")
-        return
-    
-    st.success(f"✅ Successfully connected to OpenAI API using {model_choice}")
-    st.divider()
-    
     # Sidebar for configuration
     with st.sidebar:
         st.header("⚙️ Select Scenario")
@@ -387,6 +563,12 @@ def main():
             ["Custom Input"] + list(DEMO_SCENARIOS.keys())
         )
         
+        # Performance options
+        optimize_latency = st.checkbox(
+            "⚡ Optimize for latency (higher cost)",
+            help="Use OpenAI's priority processing tier for faster responses. Falls back to the default tier if your account or model doesn't support it."
+        )
+        
         # Advanced options
         show_xml =  False
         show_prompts =  False
@@ -397,6 +579,15 @@ def main():
         st.markdown("- GPT-4 provides more comprehensive analysis")
         st.markdown("- Download BPMN files to use in process modeling tools")
 
+    # Initialize LLM
+    llm = init_llm(api_key, model_choice, optimize_latency)
+    if not llm:
+        st.error("Failed to initialize OpenAI API. Please check your API key.")
+        return
+    
+    st.success(f"✅ Successfully connected to OpenAI API using {model_choice}")
+    st.divider()
+    
     # Process input
     if scenario_choice == "Custom Input":
         process_description = st.text_area(
@@ -420,9 +611,6 @@ def main():
             st.error("Please provide a process description!")
             return
         
-        # Initialize stage templates
-        templates = BPMStageTemplates()
-        
         # Create tabs for each stage
         tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "1️⃣ Identification", 
@@ -436,44 +624,67 @@ def main():
             st.header("🎯 Process Identification")
             st.markdown("*Understanding the business context and value proposition*")
             
-            with st.spinner("Analyzing business context..."):
-                try:
-                    identification_chain = LLMChain(llm=llm, prompt=templates.identification_prompt())
-                    if show_prompts:
-                        with st.expander("View Prompt"):
-                            st.code(templates.identification_prompt().template)
-                    
-                    identification_result = identification_chain.run(description=process_description)
-                    st.markdown(identification_result)
-                except Exception as e:
-                    st.error(f"Error in identification stage: {str(e)}")
+            if show_prompts:
+                with st.expander("View Prompt"):
+                    st.code(IDENTIFICATION_PROMPT.template)
+            
+            identification_placeholder = st.empty()
         
         with tab2:
             st.header("🔍 Process Discovery")
             st.markdown("*Mapping out the current state process flow*")
             
-            with st.spinner("Discovering process steps..."):
+            if show_prompts:
+                with st.expander("View Prompt"):
+                    st.code(DISCOVERY_PROMPT.template)
+            
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                st.subheader("Process Steps")
+                discovery_placeholder = st.empty()
+            with col2:
+                st.subheader("As-Is Process Flow")
+                current_graph_placeholder = st.empty()
+        
+        # Identification and Discovery only depend on the description: models with JSON mode
+        # answer both in one completion, others run the two stages concurrently
+        with st.spinner("Analyzing business context and discovering process steps..."):
+            if model_choice in JSON_MODE_MODELS:
+                try:
+                    identification_result, discovery_result = run_identification_discovery(llm, process_description)
+                    identification_placeholder.markdown(identification_result)
+                    discovery_placeholder.markdown(discovery_result)
+                except Exception as e:
+                    identification_result = discovery_result = e
+            else:
+                identification_result, discovery_result = asyncio.run(astream_batch(
+                    llm,
+                    [IDENTIFICATION_PROMPT, DISCOVERY_PROMPT],
+                    [
+                        PlaceholderStreamHandler(identification_placeholder),
+                        TaskGraphStreamHandler(discovery_placeholder, current_graph_placeholder, "Current Process")
+                    ],
+                    description=process_description
+                ))
+        
+        with tab1:
+            if isinstance(identification_result, Exception):
+                st.error(f"Error in identification stage: {str(identification_result)}")
+        
+        with tab2:
+            if isinstance(discovery_result, Exception):
+                st.error(f"Error in discovery stage: {str(discovery_result)}")
+                current_graph_placeholder.empty()
+                discovery_result = None
+            else:
                 try:
-                    discovery_chain = LLMChain(llm=llm, prompt=templates.discovery_prompt())
-                    if show_prompts:
-                        with st.expander("View Prompt"):
-                            st.code(templates.discovery_prompt().template)
-                    
-                    discovery_result = discovery_chain.run(description=process_description)
-                    
                     # Extract tasks for visualization
                     current_tasks = extract_tasks_from_text(discovery_result)
                     
-                    col1, col2 = st.columns([1, 1])
-                    with col1:
-                        st.subheader("Process Steps")
-                        st.markdown(discovery_result)
-                    
                     with col2:
-                        st.subheader("As-Is Process Flow")
                         if current_tasks:
                             current_graph = create_enhanced_graph(current_tasks, "Current Process")
-                            st.graphviz_chart(current_graph)
+                            current_graph_placeholder.graphviz_chart(current_graph)
                             
                             # BPMN XML download
                             current_xml = generate_enhanced_bpmn_xml(current_tasks, f"{process_name} - As-Is")
@@ -494,16 +705,19 @@ def main():
             st.header("📊 Process Analysis")
             st.markdown("*Identifying bottlenecks, risks, and improvement opportunities*")
             
-            if 'discovery_result' in locals():
+            if discovery_result:
                 with st.spinner("Analyzing process inefficiencies..."):
                     try:
-                        analysis_chain = LLMChain(llm=llm, prompt=templates.analysis_prompt())
                         if show_prompts:
                             with st.expander("View Prompt"):
-                                st.code(templates.analysis_prompt().template)
+                                st.code(ANALYSIS_PROMPT.template)
                         
-                        analysis_result = analysis_chain.run(steps=discovery_result)
-                        st.markdown(analysis_result)
+                        analysis_result = stream_stage(
+                            llm,
+                            ANALYSIS_PROMPT,
+                            PlaceholderStreamHandler(st.empty()),
+                            steps=discovery_result
+                        )
                     except Exception as e:
                         st.error(f"Error in analysis stage: {str(e)}")
             else:
@@ -516,29 +730,31 @@ def main():
             if 'analysis_result' in locals():
                 with st.spinner("Redesigning process for optimization..."):
                     try:
-                        redesign_chain = LLMChain(llm=llm, prompt=templates.redesign_prompt())
                         if show_prompts:
                             with st.expander("View Prompt"):
-                                st.code(templates.redesign_prompt().template)
-                        
-                        redesign_result = redesign_chain.run(
-                            steps=discovery_result,
-                            analysis=analysis_result
-                        )
-                        
-                        # Extract redesigned tasks
-                        redesigned_tasks = extract_tasks_from_text(redesign_result)
+                                st.code(REDESIGN_PROMPT.template)
                         
                         col1, col2 = st.columns([1, 1])
+                        with col2:
+                            st.subheader("To-Be Process Flow")
+                            redesigned_graph_placeholder = st.empty()
                         with col1:
                             st.subheader("Redesigned Process")
-                            st.markdown(redesign_result)
+                            redesign_result = stream_stage(
+                                llm,
+                                REDESIGN_PROMPT,
+                                TaskGraphStreamHandler(st.empty(), redesigned_graph_placeholder, "Redesigned Process"),
+                                steps=discovery_result,
+                                analysis=analysis_result
+                            )
+                        
+                        # Extract redesigned tasks
+                        redesigned_tasks = extract_tasks_from_text(redesign_result)
                         
                         with col2:
-                            st.subheader("To-Be Process Flow")
                             if redesigned_tasks:
                                 redesigned_graph = create_enhanced_graph(redesigned_tasks, "Redesigned Process")
-                                st.graphviz_chart(redesigned_graph)
+                                redesigned_graph_placeholder.graphviz_chart(redesigned_graph)
                                 
                                 # BPMN XML download
                                 redesigned_xml = generate_enhanced_bpmn_xml(redesigned_tasks, f"{process_name} - To-Be")
@@ -564,13 +780,16 @@ def main():
             if 'redesign_result' in locals():
                 with st.spinner("Designing monitoring framework..."):
                     try:
-                        monitoring_chain = LLMChain(llm=llm, prompt=templates.monitoring_prompt())
                         if show_prompts:
                             with st.expander("View Prompt"):
-                                st.code(templates.monitoring_prompt().template)
+                                st.code(MONITORING_PROMPT.template)
                         
-                        monitoring_result = monitoring_chain.run(redesigned_process=redesign_result)
-                        st.markdown(monitoring_result)
+                        monitoring_result = stream_stage(
+                            llm,
+                            MONITORING_PROMPT,
+                            PlaceholderStreamHandler(st.empty()),
+                            redesigned_process=redesign_result
+                        )
                     except Exception as e:
                         st.error(f"Error in monitoring stage: {str(e)}")
             else: